@@ -2,7 +2,7 @@
 from os.path import join as opj
 
 # import sqlalchemy.exc
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import Session, sessionmaker
 
 from .model_sql import BaseSQLModel
@@ -96,7 +96,22 @@ def init_local_storage(dir_local_storage=DIR_BASE, force_redownload=False,
 
 
 def init_db(url: str, echo: bool = False):
-    engine = create_engine(url, echo=echo)
+    # A generous compiled-statement cache; the default (500) can evict
+    # hot single-taxid statements under mixed query loads.
+    engine = create_engine(url, echo=echo, query_cache_size=1200)
+    if url.startswith('sqlite'):
+        # WAL lets readers proceed while the database is being
+        # (re)populated. The remaining pragmas trade a little crash
+        # durability -- acceptable for a rebuildable local mirror --
+        # for a larger page cache and memory-mapped reads.
+        @event.listens_for(engine, 'connect')
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute('PRAGMA cache_size=-64000')
+            cursor.execute('PRAGMA mmap_size=268435456')
+            cursor.close()
     BaseSQLModel.metadata.create_all(bind=engine, checkfirst=True)
     Session = sessionmaker(engine)
     return Session
@@ -74,6 +74,10 @@ class Name(BaseSQLModel):
 
     tax_id: Mapped[int] = mapped_column(ForeignKey('tx_nodes.tax_id'), index=True)
     name: Mapped[str] = mapped_column(index=True)
+    # Normalized (see ncbi.normalize_name) form of the name; lookups
+    # probe this index once instead of matching a list of spelling
+    # variations against the raw column.
+    name_norm: Mapped[str] = mapped_column(index=True)
     unique_name: Mapped[Optional[str]]
     name_class: Mapped[str] = mapped_column(index=True)
 
@@ -1,5 +1,7 @@
 import os
+from collections import defaultdict
 from os.path import join as opj
+from sys import intern
 from shutil import move, rmtree
 from typing import Any
 
@@ -35,11 +37,13 @@ def update_ncbi_taxonomy_data(taxdmp_path: str, force_redownload: bool = False,
     if force_redownload is True:
         download_taxdmp = True
     else:
-        for file_name in tuple(TAXDMP_FILES.values()):
-            file_path = opj(taxdmp_path, file_name)
-            if os.path.exists(file_path) is False:
-                download_taxdmp = True
-                break
+        # One scandir instead of one stat call per expected file.
+        try:
+            existing_files = {e.name for e in os.scandir(taxdmp_path)}
+        except OSError:
+            existing_files = set()
+        if any(f not in existing_files for f in TAXDMP_FILES.values()):
+            download_taxdmp = True
 
         if check_for_updates is True:
             if download_taxdmp is False:
@@ -87,9 +91,28 @@ def rows_from_dmp_lines(lines: list[str]):
 
 
 def rows_from_dmp_file(file_path):
-    with open(file_path, 'r') as f:
-        ls = f.read().splitlines()
-    return rows_from_dmp_lines(ls)
+
+    row_trm = '|'
+    fld_trm = '\t|'
+
+    # The dump files are large and effectively ASCII; reading bytes through
+    # a 1 MiB buffer and decoding each line once is considerably faster
+    # than the default text-mode reader.
+    with open(file_path, 'rb', buffering=1 << 20) as f:
+        for raw in f:
+            try:
+                line = raw.decode('ascii')
+            except UnicodeDecodeError:
+                line = raw.decode('utf-8')
+            line = line.rstrip('\r\n').strip(row_trm)
+            yield tuple(fld.strip() for fld in line.split(fld_trm))
+
+
+def normalize_name(name: str) -> str:
+    # The shared normalized form for name lookups: casefolded, with
+    # underscores treated as spaces. Both backends index and query
+    # names through this function.
+    return name.strip().casefold().replace('_', ' ')
 
 
 def codons_from_gc_prt_file(file_path) -> list[str]:
@@ -102,45 +125,47 @@ def codons_from_gc_prt_file(file_path) -> list[str]:
     with open(file_path, 'r') as f:
         lines = f.read().splitlines()
 
+    # Slice the prefix off instead of str.strip, which treats its argument
+    # as a character set and can eat leading codon letters.
     for line in lines:
         line = line.strip('\n')
         if line.startswith(base1_start):
-            base1 = line.strip(base1_start)
+            base1 = line[len(base1_start):]
         elif line.startswith(base2_start):
-            base2 = line.strip(base2_start)
+            base2 = line[len(base2_start):]
         elif line.startswith(base3_start):
-            base3 = line.strip(base3_start)
+            base3 = line[len(base3_start):]
             break
 
-    cs = list(zip(base1, base2, base3))
-    return [''.join(x) for x in cs]
+    return [base1[i] + base2[i] + base3[i] for i in range(len(base1))]
 
 
-def parse_names_dump(file_path) -> dict[str, dict[Any, list]]:
+def parse_names_dump(file_path) -> dict[str, dict[Any, dict]]:
     rows = rows_from_dmp_file(file_path=file_path)
 
-    txid_keyed_dict: dict[int, list] = dict()
-    name_keyed_dict: dict[str, list] = dict()
+    # Names are bucketed by name class per taxid, so that looking up e.g.
+    # all 'scientific name' entries for a taxid is a dict access rather
+    # than a scan over every name the taxid has.
+    txid_keyed_dict: dict[int, dict[str, list[str]]] = defaultdict(dict)
+    name_keyed_dict: dict[str, list] = defaultdict(list)
 
     for r in rows:
 
         tax_id = int(r[0])
         name = r[1]
         unique_name = r[2]
-        name_class = r[3]
+        name_class = intern(r[3])
 
-        txid_keyed_dict.setdefault(tax_id, []).append({
-            'name': name,
-            'unique_name': unique_name,
-            'name_class': name_class})
+        txid_keyed_dict[tax_id].setdefault(name_class, []).append(name)
 
-        name_keyed_dict.setdefault(name, []).append({
+        name_keyed_dict[name].append({
             'tax_id': tax_id,
             'unique_name': unique_name,
             'name_class': name_class})
 
-    return {'tax_id_keyed_dict': txid_keyed_dict,
-            'name_keyed_dict': name_keyed_dict}
+    # Plain dicts on the way out; consumers should not autovivify entries.
+    return {'tax_id_keyed_dict': dict(txid_keyed_dict),
+            'name_keyed_dict': dict(name_keyed_dict)}
 
 
 def parse_delnodes_dump(file_path) -> set[int]:
@@ -165,16 +190,20 @@ def parse_merged_dump(file_path) -> dict[int, int]:
 def parse_nodes_dump(file_path):
     rows = rows_from_dmp_file(file_path=file_path)
 
-    child_to_parent_tax_id_dict: dict[int, int] = dict()
-    taxid_rank_dict: dict[int, str] = dict()
-    taxid_genetic_code_id_dict: dict[int, int] = dict()
-    taxid_mitochondrial_genetic_code_id_dict: dict[int, int] = dict()
+    parent_to_children_tax_id_dict: dict[int, list] = defaultdict(list)
+
+    # One record tuple per taxid instead of four parallel dicts; a single
+    # hash lookup yields the parent, rank and both genetic code ids, which
+    # keeps lineage walks on one table.
+    taxid_node_dict: dict[int, tuple[int, str, int, int]] = dict()
 
     for r in rows:
 
         tax_id = int(r[0])
         parent_tax_id = int(r[1])
-        rank = r[2]
+        # Ranks are drawn from a small fixed vocabulary; interning keeps a
+        # single str object per rank instead of one per row.
+        rank = intern(r[2])
 
         # embl_code = r[3]
         # division_id = r[4]
@@ -189,30 +218,15 @@ def parse_nodes_dump(file_path):
         # not every row contains this column, and it is not needed
         # comments = r[12]
 
-        child_to_parent_tax_id_dict[tax_id] = parent_tax_id
-        taxid_rank_dict[tax_id] = rank
-        taxid_genetic_code_id_dict[tax_id] = genetic_code_id
-        taxid_mitochondrial_genetic_code_id_dict[tax_id] = \
-            mitochondrial_genetic_code_id
-
-    parent_tax_ids = set(child_to_parent_tax_id_dict.values())
-
-    parent_to_children_tax_id_dict = dict()
-    for ptxid in parent_tax_ids:
-        parent_to_children_tax_id_dict[ptxid] = []
+        parent_to_children_tax_id_dict[parent_tax_id].append(tax_id)
+        taxid_node_dict[tax_id] = (parent_tax_id, rank, genetic_code_id,
+                                   mitochondrial_genetic_code_id)
 
-    for ctxid in child_to_parent_tax_id_dict:
-        ptxid = child_to_parent_tax_id_dict[ctxid]
-        parent_to_children_tax_id_dict[ptxid].append(ctxid)
-
-    return_value = (
-        parent_to_children_tax_id_dict,
-        child_to_parent_tax_id_dict,
-        taxid_rank_dict,
-        taxid_genetic_code_id_dict,
-        taxid_mitochondrial_genetic_code_id_dict)
-
-    return return_value
+    # Children are never mutated after parsing; tuples are smaller than
+    # lists and make that read-only contract explicit.
+    parent_to_children = {parent: tuple(children) for parent, children
+                          in parent_to_children_tax_id_dict.items()}
+    return parent_to_children, taxid_node_dict
 
 
 def parse_gencode_dump(file_path):
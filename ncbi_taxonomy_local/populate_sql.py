@@ -4,7 +4,8 @@ from sqlalchemy.orm import Session
 from .model_sql import (Citation, Codon, DeletedNode, Division, GeneticCode,
                         Image, MergedNode, Name, Node,
                         assoc_table_nodes_citations, assoc_table_nodes_images)
-from .ncbi import codons_from_gc_prt_file, rows_from_dmp_file
+from .ncbi import (codons_from_gc_prt_file, normalize_name,
+                   rows_from_dmp_file)
 
 
 def populate_nodes_table(dmp_file_path, session: Session):
@@ -73,6 +74,7 @@ def populate_names_table(dmp_file_path, session: Session):
 
         nm = {'tax_id': r[0],
               'name': r[1],
+              'name_norm': normalize_name(r[1]),
               'unique_name': unique_name,
               'name_class': r[3]}
 
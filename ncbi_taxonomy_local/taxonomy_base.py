@@ -1,8 +1,6 @@
 from abc import ABC, abstractmethod
 from collections.abc import Collection, Sequence
-from functools import partial, wraps
-from itertools import dropwhile, takewhile, zip_longest
-from operator import eq, ne
+from functools import wraps
 from typing import Any, Union
 
 from .config import init_local_storage
@@ -11,7 +9,7 @@ from .ncbi import (codons_from_gc_prt_file, parse_gencode_dump,
                    update_ncbi_taxonomy_data)
 from .utils import Log
 
-NAME_CLASSES = {
+NAME_CLASSES = frozenset({
     'acronym',
     'anamorph',
     'authority',
@@ -30,9 +28,9 @@ NAME_CLASSES = {
     'synonym',
     'teleomorph',
     'type material',
-}
+})
 
-TAXIDS_WITH_PLASTIDS = {
+TAXIDS_WITH_PLASTIDS = frozenset({
     2763,
     3027,
     5752,
@@ -53,25 +51,35 @@ TAXIDS_WITH_PLASTIDS = {
     2683617,
     2686027,
     2698737,
-}
+})
 
 
 def name_variations(name: str) -> set[str]:
-    name_alt_1 = name[0].upper() + name[1:]
-    name_alt_2 = name[0].lower() + name[1:]
-    alt_names = [name, name_alt_1, name_alt_2]
-    alt_names += [x.replace('_', ' ') for x in alt_names]
-    return set(alt_names)
+    if len(name) == 0:
+        return set()
+    alt_names = {name}
+    first = name[0]
+    # Case-flipping the first character only produces new variants when
+    # it is a letter; likewise the space variants only exist when the
+    # name actually contains underscores.
+    if first.isalpha():
+        rest = name[1:]
+        alt_names.add(first.upper() + rest)
+        alt_names.add(first.lower() + rest)
+    if '_' in name:
+        alt_names |= {x.replace('_', ' ') for x in alt_names}
+    return alt_names
 
 
 def path_between_lineages(ln1: Sequence[Any], ln2: Sequence[Any]) -> list[Any]:
-    shared = takewhile(lambda x: eq(x[0], x[1]), zip(ln1, ln2))
-    diff = dropwhile(lambda x: eq(x[0], x[1]), zip_longest(ln1, ln2,
-                                                           fillvalue=-1))
-    paths = tuple(zip(*diff))
-    return list(
-        filter(partial(ne, -1),
-               tuple(reversed(paths[0])) + (tuple(shared)[-1][0],) + paths[1]))
+    # Find the length of the shared prefix, then splice the two tails
+    # around the last shared node: down from the end of ln1, through the
+    # split point, up to the end of ln2.
+    i = 0
+    min_len = min(len(ln1), len(ln2))
+    while i < min_len and ln1[i] == ln2[i]:
+        i += 1
+    return list(reversed(ln1[i:])) + [ln1[i - 1]] + list(ln2[i:])
 
 
 def _check_initialized(func):
@@ -98,6 +106,13 @@ class Taxonomy(ABC):
     _gen_code_id_translation_table_dict = dict()
     _gen_code_id_start_codons_dict = dict()
 
+    _lineage_set_cache: dict[int, frozenset[int]] = dict()
+    _trans_table_cache: dict[int, dict[str, Union[dict, list]]] = dict()
+    _descendants_cache: dict[int, frozenset[int]] = dict()
+    _descendants_group_cache: dict[frozenset[int], frozenset[int]] = dict()
+    _plastid_taxid_set: Union[frozenset[int], None] = None
+    _name_group_taxid_cache: dict[tuple[str, int], int] = dict()
+
     # ----------------------------------------------------------------------
     def __new__(cls, data_dir: Union[str, None] = None, logger: Any = Log):
         super().__new__(cls)
@@ -139,6 +154,13 @@ class Taxonomy(ABC):
         cls._logger.msg('Loading NCBI taxonomy data.', '')
         print()
 
+        cls._lineage_set_cache = dict()
+        cls._trans_table_cache = dict()
+        cls._descendants_cache = dict()
+        cls._descendants_group_cache = dict()
+        cls._plastid_taxid_set = None
+        cls._name_group_taxid_cache = dict()
+
         cls._codons = codons_from_gc_prt_file(cls._paths['file_gc'])
 
         parse_gencode_dump_result = parse_gencode_dump(
@@ -211,6 +233,38 @@ class Taxonomy(ABC):
             message = f'{taxid}'
             raise TaxIdInvalidError(message)
 
+    @classmethod  # --------------------------------------------------------
+    @_check_initialized
+    def taxids_valid(cls, taxids: Collection[int]) -> dict[int, bool]:
+        # Bulk form of taxid_valid; resolves the bound method once
+        # instead of paying the wrapper chain per taxid.
+        updated_taxid = cls.updated_taxid
+        return {taxid: updated_taxid(taxid) >= 0 for taxid in taxids}
+
+    # Internal helpers below are only reachable through public methods
+    # that already carry the _check_initialized guard; repeating it here
+    # would add a wrapper call on every hot-path invocation.
+
+    @classmethod  # --------------------------------------------------------
+    def _normalized_taxid(cls, taxid: int) -> int:
+        # Validates and resolves a possibly-merged taxid in one pass;
+        # the taxid_valid_raise / updated_taxid pair resolves it twice.
+        new_taxid = cls.updated_taxid(taxid)
+        if new_taxid < 0:
+            message = f'{taxid}'
+            raise TaxIdInvalidError(message)
+        return new_taxid
+
+    @classmethod  # --------------------------------------------------------
+    def _cached_lineage_set(cls, taxid: int) -> frozenset[int]:
+        # Ancestry membership tests are much more common than ordered
+        # lineage reads; keep a frozenset per taxid for O(1) lookups.
+        if taxid in cls._lineage_set_cache:
+            return cls._lineage_set_cache[taxid]
+        lineage_set = frozenset(cls.lineage_of_taxids(taxid))
+        cls._lineage_set_cache[taxid] = lineage_set
+        return lineage_set
+
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def root_taxid(cls) -> int:
@@ -232,6 +286,15 @@ class Taxonomy(ABC):
                          ) -> list[str]:
         ...
 
+    @classmethod  # --------------------------------------------------------
+    @_check_initialized
+    def lineages_of_taxids(cls, taxids: Collection[int]
+                           ) -> dict[int, list[int]]:
+        # Batch convenience for callers resolving many taxids at once;
+        # repeated ancestors come out of the lineage cache.
+        lineage_of_taxids = cls.lineage_of_taxids
+        return {taxid: lineage_of_taxids(taxid) for taxid in taxids}
+
     @classmethod  # --------------------------------------------------------
     @abstractmethod
     def common_taxid(cls, taxids: Collection[int]) -> int:
@@ -276,44 +339,85 @@ class Taxonomy(ABC):
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def all_descending_taxids(cls, taxid: int) -> set[int]:
+        # Iterative traversal; the recursive version hit the interpreter
+        # recursion limit on deep subtrees and paid one call frame per
+        # node.
         cls.taxid_valid_raise(taxid)
-        return_taxids = cls.children_taxids(taxid)
-        for chld_txid in return_taxids.copy():
-            rabbit_hole = cls.all_descending_taxids(chld_txid)
-            return_taxids |= rabbit_hole
+        if taxid in cls._descendants_cache:
+            return set(cls._descendants_cache[taxid])
+        return_taxids: set[int] = set()
+        # Visit order does not matter for a set result, so a plain list
+        # used as a stack beats a deque here.
+        children_taxids = cls.children_taxids
+        add_taxid = return_taxids.add
+        cache = cls._descendants_cache
+        stack = list(children_taxids(taxid))
+        while stack:
+            chld_txid = stack.pop()
+            # The root lists itself among its own children in
+            # nodes.dmp; skipping visited taxids keeps the walk from
+            # cycling there.
+            if chld_txid in return_taxids:
+                continue
+            add_taxid(chld_txid)
+            # A subtree that was already traversed is folded in wholesale
+            # instead of being walked again.
+            if chld_txid in cache:
+                return_taxids |= cache[chld_txid]
+                continue
+            stack.extend(children_taxids(chld_txid))
+        cls._descendants_cache[taxid] = frozenset(return_taxids)
         return return_taxids
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def all_descending_taxids_for_taxids(cls, taxids: Collection[int]
                                          ) -> set[int]:
+        cache_key = frozenset(taxids)
+        if cache_key in cls._descendants_group_cache:
+            return set(cls._descendants_group_cache[cache_key])
         lca_taxid = cls.common_taxid(taxids)
         taxids = cls.all_descending_taxids(lca_taxid)
         taxids.add(lca_taxid)
+        cls._descendants_group_cache[cache_key] = frozenset(taxids)
         return taxids
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def taxid_for_name_and_group_taxid(cls, name: str, grp_taxid: int) -> int:
+        # Failures (-2) are cached too; their diagnostic messages are
+        # only printed on the first occurrence of a given query.
+        cache_key = (name, grp_taxid)
+        if cache_key in cls._name_group_taxid_cache:
+            return cls._name_group_taxid_cache[cache_key]
+        result = cls._taxid_for_name_and_group_taxid(name, grp_taxid)
+        cls._name_group_taxid_cache[cache_key] = result
+        return result
+
+    @classmethod  # --------------------------------------------------------
+    def _taxid_for_name_and_group_taxid(cls, name: str, grp_taxid: int
+                                        ) -> int:
         cls.taxid_valid_raise(grp_taxid)
         grp_name = cls.name_for_taxid(grp_taxid)
         taxids = cls.taxids_for_name(name)
         if len(taxids) == 0:
             return -2
-        lcas = [grp_taxid in cls.lineage_of_taxids(x) for x in taxids]
-
-        if True in lcas:
-            if lcas.count(True) > 1:
-                print(f'Group {grp_taxid} ({grp_name}) is too broad; multiple '
-                      f'taxa with the name "{name}" were found.')
-                return -2
-            else:
-                idx = lcas.index(True)
-                return taxids[idx]
-        else:
+        cached_lineage_set = cls._cached_lineage_set
+        match_taxid = -1
+        for x in taxids:
+            if grp_taxid in cached_lineage_set(x):
+                if match_taxid != -1:
+                    # A second match already makes the group ambiguous;
+                    # no need to check the remaining candidates.
+                    print(f'Group {grp_taxid} ({grp_name}) is too broad; '
+                          f'multiple taxa with the name "{name}" were found.')
+                    return -2
+                match_taxid = x
+        if match_taxid == -1:
             print(f'{name} does not belong to the group {grp_taxid} '
                   f'({grp_name}).')
             return -2
+        return match_taxid
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
@@ -331,7 +435,7 @@ class Taxonomy(ABC):
     @_check_initialized
     def name_for_taxid(cls, taxid: int, name_class: str = 'scientific name'
                        ) -> str:
-        cls.taxid_valid_raise(taxid)
+        # names_of_class_for_taxid validates the taxid.
         names = cls.names_of_class_for_taxid(taxid, name_class)
         if len(names) > 0:
             return names[0]
@@ -357,6 +461,10 @@ class Taxonomy(ABC):
     @_check_initialized
     def trans_table_for_genetic_code_id(cls, gcid: int
                                         ) -> dict[str, Union[dict, list]]:
+        # There are only a few dozen genetic codes; build each table once
+        # instead of redoing the codon scans on every call.
+        if gcid in cls._trans_table_cache:
+            return cls._trans_table_cache[gcid]
         codons = cls.codons()
         tt = cls._gen_code_id_translation_table_dict[gcid]
         sc = cls._gen_code_id_start_codons_dict[gcid]
@@ -383,28 +491,40 @@ class Taxonomy(ABC):
               'start_codons': start_codons,
               'stop_codons': stop_codons}
 
+        cls._trans_table_cache[gcid] = rv
         return rv
 
+    @classmethod  # --------------------------------------------------------
+    @_check_initialized
+    def is_ancestor(cls, taxid_anc: int, taxid_desc: int) -> bool:
+        # A taxid is considered its own ancestor, matching the LCA-based
+        # checks this replaces.
+        cls.taxid_valid_raise(taxid_anc)
+        cls.taxid_valid_raise(taxid_desc)
+        return cls.updated_taxid(taxid_anc) in cls._cached_lineage_set(
+            taxid_desc)
+
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def is_eukaryote(cls, taxid: int) -> bool:
-        cls.taxid_valid_raise(taxid)
         euk_taxid = 2759
-        shared_taxid = cls.common_taxid([euk_taxid, taxid])
-        if shared_taxid == euk_taxid:
-            return True
-        else:
-            return False
+        return cls.is_ancestor(euk_taxid, taxid)
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def contains_plastid(cls, taxid: int) -> bool:
-        cls.taxid_valid_raise(taxid)
-        for taxid_w_plastid in TAXIDS_WITH_PLASTIDS:
-            shared_taxid = cls.common_taxid([taxid_w_plastid, taxid])
-            if shared_taxid == taxid_w_plastid:
-                return True
-        return False
+        # The first call flattens the plastid-bearing groups and their
+        # descendants into one set; after that each query is a single
+        # membership test instead of a lineage walk.
+        if cls._plastid_taxid_set is None:
+            plastid_taxids: set[int] = set()
+            for group_taxid in TAXIDS_WITH_PLASTIDS:
+                if cls.taxid_valid(group_taxid) is False:
+                    continue
+                plastid_taxids.add(cls.updated_taxid(group_taxid))
+                plastid_taxids |= cls.all_descending_taxids(group_taxid)
+            cls._plastid_taxid_set = frozenset(plastid_taxids)
+        return cls._normalized_taxid(taxid) in cls._plastid_taxid_set
 
     @classmethod  # --------------------------------------------------------
     @abstractmethod
@@ -426,8 +546,9 @@ class Taxonomy(ABC):
         # Balanophoraceae uses 32 instead of 11?
         # Check this, NCBI taxonomy DB reports 11.
         # https://www.ncbi.nlm.nih.gov/pubmed/30598433
+        # The old check compared a str against an int and so never fired.
         taxid_bala = cls.updated_taxid(25673)
-        if str(cls.common_taxid([taxid_bala, taxid])) == taxid_bala:
+        if taxid_bala in cls._cached_lineage_set(taxid):
             return 32
         # --------------------------------------------
         return 11
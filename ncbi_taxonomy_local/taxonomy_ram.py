@@ -1,28 +1,41 @@
+import os
+import pickle
 from collections.abc import Collection
+from os.path import join as opj
 from typing import Any, Union
 
-from .ncbi import (parse_delnodes_dump, parse_merged_dump, parse_names_dump,
-                   parse_nodes_dump)
-from .taxonomy_base import (Taxonomy, _check_initialized, name_variations,
+from .errors import NameClassInvalidError
+from .ncbi import (normalize_name, parse_delnodes_dump, parse_merged_dump,
+                   parse_names_dump, parse_nodes_dump)
+from .taxonomy_base import (Taxonomy, _check_initialized,
                             path_between_lineages)
-from .utils import Log, invert_dict
+from .utils import Log
+
+CACHE_FILE_NAME = 'taxonomy-ram.pickle'
+CACHE_FORMAT_VERSION = 3
 
 
 class TaxonomyRAM(Taxonomy):
 
     _names_taxids_dict = dict()
+    _names_casefold_taxids_dict: dict[str, tuple[int, ...]] = dict()
     _taxids_names_dict = dict()
+    _taxids_sciname_dict: dict[int, str] = dict()
+    _taxids_common_name_dict: dict[int, str] = dict()
+    _taxids_genbank_common_name_dict: dict[int, str] = dict()
 
-    _taxids_rank_dict = dict()
-
-    _taxids_child_parent_dict = dict()
+    # taxid -> (parent_taxid, rank, genetic_code_id, mito_genetic_code_id)
+    _taxids_node_dict: dict[int, tuple[int, str, int, int]] = dict()
     _taxids_parent_children_dict = dict()
 
-    _taxids_deleted_set = set()
+    _taxids_deleted_set: frozenset[int] = frozenset()
     _taxids_merged_dict = dict()
 
-    _taxids_genetic_code_id_dict = dict()
-    _taxids_mito_genetic_code_id_dict = dict()
+    # Merged taxids map to their replacement, deleted ones to -1.
+    _taxids_resolved_dict: dict[int, int] = dict()
+
+    _lineage_cache: dict[tuple[int, str], dict] = dict()
+    _lineage_taxids_cache: dict[int, tuple[int, ...]] = dict()
 
     # ----------------------------------------------------------------------
     def __new__(cls, data_dir: Union[str, None] = None, logger: Any = Log,
@@ -46,21 +59,111 @@ class TaxonomyRAM(Taxonomy):
 
         assert cls._paths is not None
 
-        tax_dict = parse_names_dump(cls._paths['file_names'])
-        cls._names_taxids_dict = tax_dict['name_keyed_dict']
-        cls._taxids_names_dict = tax_dict['tax_id_keyed_dict']
+        cls._lineage_cache = dict()
+        cls._lineage_taxids_cache = dict()
+
+        dump_paths = (cls._paths['file_names'], cls._paths['file_delnodes'],
+                      cls._paths['file_merged'], cls._paths['file_nodes'])
+        cache_path = opj(cls._paths['dir_cache'], CACHE_FILE_NAME)
+
+        data = cls._load_parsed_data_cache(cache_path, dump_paths)
+
+        if data is None:
+            tax_dict = parse_names_dump(cls._paths['file_names'])
+
+            # One exact-match dict keyed by a normalized (casefolded,
+            # underscores-to-spaces) form of every name; name lookups
+            # become a single dict access instead of one probe per
+            # spelling variation.
+            casefold_index: dict[str, set[int]] = {}
+            for name, entries in tax_dict['name_keyed_dict'].items():
+                key = normalize_name(name)
+                casefold_index.setdefault(key, set()).update(
+                    e['tax_id'] for e in entries)
+
+            data = {
+                'version': CACHE_FORMAT_VERSION,
+                'names_taxids': tax_dict['name_keyed_dict'],
+                'names_casefold_taxids': {
+                    key: tuple(sorted(taxids))
+                    for key, taxids in casefold_index.items()},
+                'taxids_names': tax_dict['tax_id_keyed_dict'],
+
+                # Flat taxid -> name maps for the most frequently
+                # requested name classes.
+                'taxids_sciname': {
+                    taxid: ns['scientific name'][0]
+                    for taxid, ns in tax_dict['tax_id_keyed_dict'].items()
+                    if 'scientific name' in ns},
+                'taxids_common_name': {
+                    taxid: ns['common name'][0]
+                    for taxid, ns in tax_dict['tax_id_keyed_dict'].items()
+                    if 'common name' in ns},
+                'taxids_genbank_common_name': {
+                    taxid: ns['genbank common name'][0]
+                    for taxid, ns in tax_dict['tax_id_keyed_dict'].items()
+                    if 'genbank common name' in ns},
+
+                'taxids_deleted': parse_delnodes_dump(
+                    cls._paths['file_delnodes']),
+                'taxids_merged': parse_merged_dump(
+                    cls._paths['file_merged'])}
+
+            _ = parse_nodes_dump(cls._paths['file_nodes'])
+            data['taxids_parent_children'] = _[0]
+            data['taxids_node'] = _[1]
+
+            cls._write_parsed_data_cache(cache_path, data)
+
+        cls._names_taxids_dict = data['names_taxids']
+        cls._names_casefold_taxids_dict = data['names_casefold_taxids']
+        cls._taxids_names_dict = data['taxids_names']
+        cls._taxids_sciname_dict = data['taxids_sciname']
+        cls._taxids_common_name_dict = data['taxids_common_name']
+        cls._taxids_genbank_common_name_dict = \
+            data['taxids_genbank_common_name']
+        cls._taxids_deleted_set = frozenset(data['taxids_deleted'])
+        cls._taxids_merged_dict = data['taxids_merged']
+        cls._taxids_parent_children_dict = data['taxids_parent_children']
+        cls._taxids_node_dict = data['taxids_node']
+
+        # One combined map turns updated_taxid into an active check plus
+        # a single get; cheap to rebuild, so it stays out of the pickle.
+        resolved = {taxid: -1 for taxid in cls._taxids_deleted_set}
+        resolved.update(cls._taxids_merged_dict)
+        cls._taxids_resolved_dict = resolved
 
-        cls._taxids_deleted_set = parse_delnodes_dump(
-            cls._paths['file_delnodes'])
-        cls._taxids_merged_dict = parse_merged_dump(
-            cls._paths['file_merged'])
+    @classmethod  # --------------------------------------------------------
+    def _load_parsed_data_cache(cls, cache_path, dump_paths):
+        # Parsing the dump files takes tens of seconds; the pickled result
+        # loads in a second or two. The cache is valid as long as it is
+        # newer than every dump file it was built from.
+        try:
+            cache_mtime = os.path.getmtime(cache_path)
+        except OSError:
+            return None
+        if any(os.path.getmtime(p) > cache_mtime for p in dump_paths):
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        if not isinstance(data, dict):
+            return None
+        if data.get('version') != CACHE_FORMAT_VERSION:
+            return None
+        cls._logger.msg('Loaded parsed taxonomy data from cache:',
+                        cache_path)
+        return data
 
-        _ = parse_nodes_dump(cls._paths['file_nodes'])
-        cls._taxids_parent_children_dict = _[0]
-        cls._taxids_child_parent_dict = _[1]
-        cls._taxids_rank_dict = _[2]
-        cls._taxids_genetic_code_id_dict = _[3]
-        cls._taxids_mito_genetic_code_id_dict = _[4]
+    @classmethod  # --------------------------------------------------------
+    def _write_parsed_data_cache(cls, cache_path, data):
+        try:
+            with open(cache_path, 'wb') as f:
+                pickle.dump(data, f, protocol=5)
+        except OSError as e:
+            cls._logger.wrn('Could not write taxonomy cache file:', str(e))
 
     # **********************************************************************
     # Operations on integer taxids.
@@ -86,78 +189,108 @@ class TaxonomyRAM(Taxonomy):
     @_check_initialized
     def taxid_active(cls, taxid: int) -> bool:
         taxid_active = False
-        if taxid in cls._taxids_child_parent_dict:
+        if taxid in cls._taxids_node_dict:
             taxid_active = True
         return taxid_active
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def updated_taxid(cls, taxid: int) -> int:
-        taxid_active = cls.taxid_active(taxid)
-        if taxid_active is True:
+        if taxid in cls._taxids_node_dict:
             return taxid
-        taxid_merged = cls.taxid_merged(taxid)
-        if taxid_merged is True:
-            return cls._taxids_merged_dict[taxid]
-        taxid_deleted = cls.taxid_deleted(taxid)
-        if taxid_deleted is True:
-            return -1
-        return -2
+        return cls._taxids_resolved_dict.get(taxid, -2)
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def lineage_of_taxids(cls, taxid: int) -> list[int]:
-        ln = cls._lineage(taxid)
-        return ln['taxids']
+        # The cache holds tuples; hand out fresh lists so callers can
+        # mutate their copy without corrupting cached lineages.
+        return list(cls._lineage_taxids(taxid))
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def lineage_of_ranks(cls, taxid: int) -> list[str]:
         ln = cls._lineage(taxid)
-        return ln['ranks']
+        return list(ln['ranks'])
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def lineage_of_names(cls, taxid: int, name_class: str = 'scientific name'
                          ) -> list[str]:
         ln = cls._lineage(taxid, name_class)
-        return ln['names']
+        return list(ln['names'])
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def common_taxid(cls, taxids: Collection[int]) -> int:
+        # Lineages are root-ordered, so the lowest common ancestor is the
+        # last member of the longest shared prefix. This replaces the old
+        # set-intersection pass plus one extra lineage walk per shared
+        # ancestor. Invalid taxids raise from inside lineage_of_taxids.
         taxids = list(taxids)
-        shared = set(cls.lineage_of_taxids(taxids[0]))
+        lineage_taxids = cls._lineage_taxids
+        if len(taxids) == 2:
+            # The common pairwise case (e.g. from path_between_taxids):
+            # walk the second lineage bottom-up and stop at the first
+            # member of the first lineage.
+            seen = cls._cached_lineage_set(taxids[0])
+            for t in reversed(lineage_taxids(taxids[1])):
+                if t in seen:
+                    return t
+        shared = lineage_taxids(taxids[0])
+        n_shared = len(shared)
         for taxid in taxids[1:]:
-            cls.taxid_valid_raise(taxid)
-            lineage = cls.lineage_of_taxids(taxid=taxid)
-            shared = shared & set(lineage)
-        shared_lineage = tuple()
-        for taxid in shared:
-            lineage = cls.lineage_of_taxids(taxid=taxid)
-            if len(lineage) > len(shared_lineage):
-                shared_lineage = lineage
-        return shared_lineage[-1]
+            lineage = lineage_taxids(taxid)
+            limit = min(n_shared, len(lineage))
+            i = 0
+            while i < limit and shared[i] == lineage[i]:
+                i += 1
+            n_shared = i
+        return shared[n_shared - 1]
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def names_for_taxid(cls, taxid: int) -> dict[str, tuple[str]]:
-        cls.taxid_valid_raise(taxid)
-        names = cls._taxids_names_dict[cls.updated_taxid(taxid=taxid)]
-        return invert_dict({x['name']: x['name_class'] for x in names}, tuple,
-                           True)
+        names = cls._taxids_names_dict[cls._normalized_taxid(taxid)]
+        return {name_class: tuple(ns) for name_class, ns in names.items()}
+
+    @classmethod  # --------------------------------------------------------
+    @_check_initialized
+    def scientific_name_for_taxid(cls, taxid: int) -> str:
+        # Fast path: a single dict read instead of the generic
+        # name_for_taxid -> names_of_class_for_taxid -> names_for_taxid
+        # call chain.
+        return cls._taxids_sciname_dict.get(cls._normalized_taxid(taxid), '')
+
+    @classmethod  # --------------------------------------------------------
+    @_check_initialized
+    def common_name_for_taxid(cls, taxid: int) -> str:
+        return cls._taxids_common_name_dict.get(
+            cls._normalized_taxid(taxid), '')
+
+    @classmethod  # --------------------------------------------------------
+    @_check_initialized
+    def genbank_common_name_for_taxid(cls, taxid: int) -> str:
+        return cls._taxids_genbank_common_name_dict.get(
+            cls._normalized_taxid(taxid), '')
+
+    @classmethod  # --------------------------------------------------------
+    @_check_initialized
+    def name_for_taxid(cls, taxid: int, name_class: str = 'scientific name'
+                       ) -> str:
+        # The overwhelmingly common case; route it through the flat
+        # scientific name map.
+        if name_class == 'scientific name':
+            return cls.scientific_name_for_taxid(taxid)
+        return super().name_for_taxid(taxid, name_class)
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def taxids_for_name(cls, name: str) -> list[int]:
-        if len(name) != 0:
-            names = name_variations(name)
-            for name in names:
-                if name in cls._names_taxids_dict:
-                    ids = [x['tax_id'] for x in cls._names_taxids_dict[name]]
-                    ids.sort()
-                    return ids
-        return list()
+        if len(name) == 0:
+            return list()
+        key = normalize_name(name)
+        return list(cls._names_casefold_taxids_dict.get(key, ()))
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
@@ -168,34 +301,57 @@ class TaxonomyRAM(Taxonomy):
         if taxid1 == taxid2:
             return [taxid1]
 
-        ln1 = cls.lineage_of_taxids(taxid1)
-        ln2 = cls.lineage_of_taxids(taxid2)
+        ln1 = cls._lineage_taxids(taxid1)
+        ln2 = cls._lineage_taxids(taxid2)
 
         return path_between_lineages(ln1, ln2)
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def rank_for_taxid(cls, taxid: int) -> str:
-        cls.taxid_valid_raise(taxid)
-        taxid = cls.updated_taxid(taxid)
-        return cls._taxids_rank_dict[taxid]
+        return cls._taxids_node_dict[cls._normalized_taxid(taxid)][1]
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def parent_taxid(cls, taxid: int) -> int:
-        cls.taxid_valid_raise(taxid)
-        taxid = cls.updated_taxid(taxid)
-        return cls._taxids_child_parent_dict[taxid]
+        return cls._taxids_node_dict[cls._normalized_taxid(taxid)][0]
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def children_taxids(cls, taxid: int) -> set[int]:
-        cls.taxid_valid_raise(taxid)
-        taxid = cls.updated_taxid(taxid)
+        taxid = cls._normalized_taxid(taxid)
         if taxid in cls._taxids_parent_children_dict:
             return set(cls._taxids_parent_children_dict[taxid])
         return set()
 
+    @classmethod  # --------------------------------------------------------
+    @_check_initialized
+    def all_descending_taxids(cls, taxid: int) -> set[int]:
+        # Walks the parent -> children table directly; the generic
+        # traversal pays a children_taxids call and a set copy per node.
+        if taxid in cls._descendants_cache:
+            return set(cls._descendants_cache[taxid])
+        children_dict = cls._taxids_parent_children_dict
+        cache = cls._descendants_cache
+        return_taxids: set[int] = set()
+        stack = list(children_dict.get(cls._normalized_taxid(taxid), ()))
+        while stack:
+            t = stack.pop()
+            # The root lists itself among its own children in
+            # nodes.dmp; skipping visited taxids keeps the walk from
+            # cycling there.
+            if t in return_taxids:
+                continue
+            return_taxids.add(t)
+            # Fold in subtrees that were already traversed.
+            if t in cache:
+                return_taxids |= cache[t]
+                continue
+            if t in children_dict:
+                stack.extend(children_dict[t])
+        cls._descendants_cache[taxid] = frozenset(return_taxids)
+        return return_taxids
+
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def higher_rank_for_taxid(cls, taxid: int, rank: str,
@@ -212,51 +368,71 @@ class TaxonomyRAM(Taxonomy):
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def genetic_code_for_taxid(cls, taxid: int) -> int:
-        cls.taxid_valid_raise(taxid)
-        return cls._taxids_genetic_code_id_dict[taxid]
+        return cls._taxids_node_dict[cls._normalized_taxid(taxid)][2]
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def mito_genetic_code_for_taxid(cls, taxid: int) -> int:
-        cls.taxid_valid_raise(taxid)
-        return cls._taxids_mito_genetic_code_id_dict[taxid]
+        return cls._taxids_node_dict[cls._normalized_taxid(taxid)][3]
 
     # **********************************************************************
     # Private methods.
     # **********************************************************************
 
     @classmethod  # --------------------------------------------------------
-    @_check_initialized
-    def _lineage(cls, taxid: int, name_class: str = 'scientific name'
-                 ) -> dict[str, list]:
-        cls.taxid_valid_raise(taxid)
-        return_dict = dict()
-        return_dict['old_taxid'] = taxid
-        new_taxid = cls.updated_taxid(taxid=taxid)
-        return_dict['new_taxid'] = new_taxid
-        return_dict['taxids'] = []
-        return_dict['ranks'] = []
-        return_dict['names'] = []
-
-        def recurse_lineage(taxid, lineage):
-            lineage.append(taxid)
-            if taxid != cls.root_taxid():
-                taxid = cls.parent_taxid(taxid=taxid)
-                return recurse_lineage(taxid, lineage)
-            else:
-                return lineage
+    def _lineage_taxids(cls, taxid: int) -> tuple[int, ...]:
+        # Taxid-only fast path for the many callers (LCA, paths, ancestry
+        # sets) that never look at ranks or names. Only called from
+        # public methods that already check initialization.
+        new_taxid = cls._normalized_taxid(taxid)
+        cache = cls._lineage_taxids_cache
+        if new_taxid in cache:
+            return cache[new_taxid]
+
+        node_dict = cls._taxids_node_dict
+        root_taxid = cls._root_taxid
 
         taxids = list()
         if new_taxid > 0:
-            taxids = recurse_lineage(taxid=new_taxid, lineage=taxids)
+            t = new_taxid
+            while t != root_taxid:
+                taxids.append(t)
+                t = node_dict[t][0]
+            taxids.append(root_taxid)
 
         taxids.reverse()
+        lineage = tuple(taxids)
+        cache[new_taxid] = lineage
+        return lineage
+
+    @classmethod  # --------------------------------------------------------
+    def _lineage(cls, taxid: int, name_class: str = 'scientific name'
+                 ) -> dict[str, Any]:
+        # Only called from public methods that already check
+        # initialization.
+        cache_key = (taxid, name_class)
+        if cache_key in cls._lineage_cache:
+            return cls._lineage_cache[cache_key]
+        return_dict = dict()
+        return_dict['old_taxid'] = taxid
+        new_taxid = cls._normalized_taxid(taxid)
+        return_dict['new_taxid'] = new_taxid
+
+        taxids = cls._lineage_taxids(new_taxid)
         return_dict['taxids'] = taxids
 
-        ranks = [cls.rank_for_taxid(taxid=x) for x in taxids]
+        node_dict = cls._taxids_node_dict
+        ranks = tuple(node_dict[x][1] for x in taxids)
         return_dict['ranks'] = ranks
 
-        names = [cls.name_for_taxid(x, name_class) for x in taxids]
+        # Lineage members are known-active; read their names directly
+        # instead of re-validating each one through name_for_taxid.
+        if name_class not in cls._name_classes:
+            raise NameClassInvalidError(name_class)
+        names_dict = cls._taxids_names_dict
+        names = tuple(names_dict.get(x, {}).get(name_class, ('',))[0]
+                      for x in taxids)
         return_dict['names'] = names
 
+        cls._lineage_cache[cache_key] = return_dict
         return return_dict
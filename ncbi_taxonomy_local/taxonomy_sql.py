@@ -1,14 +1,16 @@
-from collections.abc import Collection, MutableSequence
+from collections.abc import Collection
 from typing import Any, Union
 
-from sqlalchemy import select
+from sqlalchemy import Select, bindparam, exists, inspect, select, text, update
 from sqlalchemy.orm import Session
 
 from .config import init_db, populate_db
+from .errors import NameClassInvalidError, TaxIdInvalidError
 from .model_sql import DeletedNode, MergedNode, Name, Node
-from .taxonomy_base import (Taxonomy, _check_initialized, name_variations,
+from .ncbi import normalize_name
+from .taxonomy_base import (Taxonomy, _check_initialized,
                             path_between_lineages)
-from .utils import Log, invert_dict
+from .utils import Log
 
 
 class TaxonomySQL(Taxonomy):
@@ -16,6 +18,37 @@ class TaxonomySQL(Taxonomy):
     _sess: Session
     _root_node: Node
 
+    # The database is static between init() calls, so resolution and
+    # name-lookup results are safe to memoize for the session.
+    _updated_taxid_cache: dict[int, int] = dict()
+    _name_taxids_cache: dict[str, tuple[int, ...]] = dict()
+
+    # In-memory copy of the node table -- (parent, rank, genetic code
+    # id, mitochondrial genetic code id) per taxid -- plus a children
+    # index, loaded with one SELECT on first use. The table is small
+    # and static between init() calls, so hot lineage, rank and parent
+    # lookups become dict hits instead of DB round trips.
+    _node_tbl: Union[dict[int, tuple[int, str, int, int]], None] = None
+    _children_tbl: dict[int, tuple[int, ...]] = dict()
+
+    # Whole lineages cached as immutable tuples keyed by resolved taxid;
+    # ranks and names are derived from the taxid chain on demand.
+    _lineage_taxids_cache: dict[int, tuple[int, ...]] = dict()
+
+    # Hot single-taxid statements, built once at class definition time;
+    # per-call construction made SQLAlchemy re-derive the compiled-cache
+    # key every time.
+    _stmt_active_taxid: Select = select(Node.tax_id).where(
+        Node.tax_id == bindparam('taxid'))
+    _stmt_merged_new_taxid: Select = select(MergedNode.new_tax_id).where(
+        MergedNode.old_tax_id == bindparam('taxid'))
+    _stmt_exists_node: Select = select(
+        exists().where(Node.tax_id == bindparam('taxid')))
+    _stmt_exists_merged: Select = select(
+        exists().where(MergedNode.old_tax_id == bindparam('taxid')))
+    _stmt_exists_deleted: Select = select(
+        exists().where(DeletedNode.tax_id == bindparam('taxid')))
+
     # ----------------------------------------------------------------------
     def __new__(cls,
                 data_dir: Union[str, None] = None,
@@ -71,9 +104,54 @@ class TaxonomySQL(Taxonomy):
             populate_db(cls._paths, cls._sess, cls._logger)
             print()
 
+        cls._upgrade_name_norm()
+
+        cls._updated_taxid_cache = dict()
+        cls._name_taxids_cache = dict()
+        cls._node_tbl = None
+        cls._children_tbl = dict()
+        cls._lineage_taxids_cache = dict()
+
         cls._taxonomy_initialized = True
         cls._root_node = cls.node_for_taxid(cls._root_taxid)
 
+    @classmethod  # --------------------------------------------------------
+    def _upgrade_name_norm(cls):
+        # Databases built before the name_norm column existed cannot be
+        # upgraded by create_all (it never alters existing tables), and
+        # the populate gate above does not re-run on a filled database.
+        # Add, backfill and index the column here instead of failing
+        # with OperationalError on the first name lookup.
+        sess = cls._sess
+        column_names = {c['name'] for c in
+                        inspect(sess.get_bind()).get_columns('tx_names')}
+        if 'name_norm' in column_names:
+            return
+        cls._logger.msg('Upgrading database:', 'adding tx_names.name_norm')
+        sess.execute(text(
+            'ALTER TABLE tx_names ADD COLUMN name_norm VARCHAR'))
+        # Keyset-paginate on the primary key so only one batch of rows
+        # is ever resident, with a bulk UPDATE by primary key per
+        # batch; tx_names runs to millions of rows.
+        batch_size = 100000
+        last_id = 0
+        while True:
+            rows = sess.execute(select(Name.id, Name.name)
+                                .where(Name.id > last_id)
+                                .order_by(Name.id)
+                                .limit(batch_size)).all()
+            if len(rows) == 0:
+                break
+            sess.execute(update(Name),
+                         [{'id': pk, 'name_norm': normalize_name(nm)}
+                          for pk, nm in rows])
+            last_id = rows[-1][0]
+        # Same name the model's index=True would generate on a fresh
+        # database.
+        sess.execute(text('CREATE INDEX IF NOT EXISTS '
+                          'ix_tx_names_name_norm ON tx_names (name_norm)'))
+        sess.commit()
+
     @classmethod  # --------------------------------------------------------
     def update(cls, check_for_updates: bool = False):
         super().update(check_for_updates)
@@ -85,80 +163,118 @@ class TaxonomySQL(Taxonomy):
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def taxid_deleted(cls, taxid: int) -> bool:
-        taxid_deleted = False
-        stmt = select(DeletedNode).where(DeletedNode.tax_id == taxid)
-        if len(cls._sess.scalars(stmt).all()) > 0:
-            taxid_deleted = True
-        return taxid_deleted
+        # EXISTS lets the database stop at the first match instead of
+        # materializing rows just to count them.
+        return bool(cls._sess.scalar(cls._stmt_exists_deleted,
+                                     {'taxid': taxid}))
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def taxid_merged(cls, taxid: int) -> bool:
-        taxid_merged = False
-        stmt = select(MergedNode.old_tax_id).where(
-            MergedNode.old_tax_id == taxid)
-        if len(cls._sess.scalars(stmt).all()) > 0:
-            taxid_merged = True
-        return taxid_merged
+        return bool(cls._sess.scalar(cls._stmt_exists_merged,
+                                     {'taxid': taxid}))
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def taxid_active(cls, taxid: int) -> bool:
-        taxid_active = False
-        stmt = select(Node).where(Node.tax_id == taxid)
-        if len(cls._sess.scalars(stmt).all()) > 0:
-            taxid_active = True
-        return taxid_active
+        return bool(cls._sess.scalar(cls._stmt_exists_node,
+                                     {'taxid': taxid}))
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def updated_taxid(cls, taxid: int) -> int:
-        taxid_active = cls.taxid_active(taxid)
-        if taxid_active is True:
+        # One scalar probe per table, stopping at the first hit; the
+        # merged branch previously queried its table twice (existence,
+        # then the replacement taxid).
+        cache = cls._updated_taxid_cache
+        if taxid in cache:
+            return cache[taxid]
+        cache[taxid] = result = cls._updated_taxid(taxid)
+        return result
+
+    @classmethod  # --------------------------------------------------------
+    def _updated_taxid(cls, taxid: int) -> int:
+        sess = cls._sess
+        params = {'taxid': taxid}
+        if sess.scalars(cls._stmt_active_taxid, params).first() is not None:
             return taxid
-        taxid_merged = cls.taxid_merged(taxid)
-        if taxid_merged is True:
-            stmt = select(MergedNode.new_tax_id).where(
-                MergedNode.old_tax_id == taxid)
-            rslt = cls._sess.scalars(stmt).all()
-            assert len(rslt) == 1
-            return rslt[0]
-        taxid_deleted = cls.taxid_deleted(taxid)
-        if taxid_deleted is True:
+        new_taxid = sess.scalars(cls._stmt_merged_new_taxid, params).first()
+        if new_taxid is not None:
+            return new_taxid
+        if sess.scalar(cls._stmt_exists_deleted, params):
             return -1
         return -2
 
+    @classmethod  # --------------------------------------------------------
+    def _node_table(cls) -> dict[int, tuple[int, str, int, int]]:
+        if cls._node_tbl is None:
+            stmt = select(Node.tax_id, Node.parent_tax_id, Node.rank,
+                          Node.genetic_code_id,
+                          Node.mitochondrial_genetic_code_id)
+            node_tbl: dict[int, tuple[int, str, int, int]] = dict()
+            children: dict[int, list[int]] = dict()
+            for txid, parent_txid, rank, gcid, mgcid in \
+                    cls._sess.execute(stmt):
+                node_tbl[txid] = (parent_txid, rank, gcid,
+                                  0 if mgcid is None else mgcid)
+                children.setdefault(parent_txid, []).append(txid)
+            cls._node_tbl = node_tbl
+            cls._children_tbl = {parent: tuple(chld_txids) for
+                                 parent, chld_txids in children.items()}
+        return cls._node_tbl
+
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def lineage_of_taxids(cls, taxid: int) -> list[int]:
-        # cls.taxid_valid_raise(taxid)
-        nd = cls.node_for_taxid(taxid)
-        ln = cls.lineage_of_nodes(nd)
-        ln_taxid = [n.tax_id for n in ln]
+        txid = cls._normalized_taxid(taxid)
+        cache = cls._lineage_taxids_cache
+        if txid in cache:
+            return list(cache[txid])
+
+        # The in-memory node table makes the walk to the root a chain
+        # of dict hits. The root node is its own parent.
+        node_tbl = cls._node_table()
+        ln_taxid = list()
+        t = txid
+        while True:
+            ln_taxid.append(t)
+            parent_taxid = node_tbl[t][0]
+            if parent_taxid == t:
+                break
+            t = parent_taxid
+        ln_taxid.reverse()
+        # Cached as a tuple; callers get a fresh list they may mutate.
+        cache[txid] = tuple(ln_taxid)
         return ln_taxid
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def lineage_of_ranks(cls, taxid: int) -> list[str]:
-        # cls.taxid_valid_raise(taxid)
-        nd = cls.node_for_taxid(taxid)
-        ln = cls.lineage_of_nodes(nd)
-        ln_rank = [n.rank for n in ln]
-        return ln_rank
+        node_tbl = cls._node_table()
+        return [node_tbl[x][1] for x in cls.lineage_of_taxids(taxid)]
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def lineage_of_names(cls, taxid: int, name_class: str = 'scientific name'
                          ) -> list[str]:
-        # cls.taxid_valid_raise(taxid)
+        if name_class not in cls._name_classes:
+            raise NameClassInvalidError(name_class)
         ln_taxid = cls.lineage_of_taxids(taxid)
-        ln_name = [cls.name_for_taxid(x, name_class) for x in ln_taxid]
-        return ln_name
+        # One query fetches every name in the lineage; name_for_taxid
+        # per ancestor was a query per lineage member.
+        stmt = select(Name.tax_id, Name.name).where(
+            Name.tax_id.in_(ln_taxid), Name.name_class == name_class)
+        name_for_txid: dict[int, str] = dict()
+        for txid, name in cls._sess.execute(stmt).all():
+            name_for_txid.setdefault(txid, name)
+        return [name_for_txid.get(x, '') for x in ln_taxid]
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def common_taxid(cls, taxids: Collection[int]) -> int:
-        nodes = cls.nodes_for_taxids(taxids)
+        # Duplicates contribute nothing to the LCA; scan each distinct
+        # lineage once.
+        nodes = cls.nodes_for_taxids(dict.fromkeys(taxids))
         node = cls.common_node(nodes)
         return node.tax_id
 
@@ -173,101 +289,149 @@ class TaxonomySQL(Taxonomy):
     @_check_initialized
     def taxids_for_name(cls, name: str) -> list[int]:
         name = name.strip()
-        if len(name) != 0:
-            names = name_variations(name)
-            stmt = select(Name.tax_id).where(Name.name.in_(names))
-            ids = list(set(cls._sess.scalars(stmt).all()))
-            ids.sort()
-            return ids
-        else:
+        if len(name) == 0:
             return list()
+        cache = cls._name_taxids_cache
+        if name in cache:
+            return list(cache[name])
+        # One probe on the normalized-name index covers every spelling
+        # variation, instead of an IN over a pre-generated list.
+        stmt = select(Name.tax_id).where(
+            Name.name_norm == normalize_name(name))
+        ids = sorted(set(cls._sess.scalars(stmt).all()))
+        cache[name] = tuple(ids)
+        return ids
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def path_between_taxids(cls, taxid1: int, taxid2: int) -> list[int]:
-        cls.taxid_valid_raise(taxid1)
-        cls.taxid_valid_raise(taxid2)
-        nd1 = cls.node_for_taxid(taxid1)
-        nd2 = cls.node_for_taxid(taxid2)
-        path_nd = cls.path_between_nodes(nd1, nd2)
-        return [n.tax_id for n in path_nd]
+        # Integer lineages come straight from the in-memory node table;
+        # no ORM nodes are hydrated for an integer-only answer.
+        txid1 = cls._normalized_taxid(taxid1)
+        txid2 = cls._normalized_taxid(taxid2)
+        if txid1 == txid2:
+            return [txid1]
+        return path_between_lineages(cls.lineage_of_taxids(txid1),
+                                     cls.lineage_of_taxids(txid2))
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def rank_for_taxid(cls, taxid: int) -> str:
-        # cls.taxid_valid_raise(taxid)
-        nd = cls.node_for_taxid(taxid)
-        return nd.rank
+        return cls._node_table()[cls._normalized_taxid(taxid)][1]
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def parent_taxid(cls, taxid: int) -> int:
-        # cls.taxid_valid_raise(taxid)
-        nd = cls.node_for_taxid(taxid)
-        return nd.parent_tax_id
+        return cls._node_table()[cls._normalized_taxid(taxid)][0]
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def children_taxids(cls, taxid: int) -> set[int]:
-        # cls.taxid_valid_raise(taxid)
-        taxid = cls.updated_taxid(taxid)
-        nd = cls.node_for_taxid(taxid)
-        return set(cls.taxids_for_nodes(nd.children))
+        txid = cls._normalized_taxid(taxid)
+        cls._node_table()
+        return set(cls._children_tbl.get(txid, ()))
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def higher_rank_for_taxid(cls, taxid: int, rank: str,
                               name_class: str = 'scientific name'
                               ) -> str:
-        # cls.taxid_valid_raise(taxid)
-        ln_rank = cls.lineage_of_ranks(taxid)
-        if rank in ln_rank:
-            rank_index = ln_rank.index(rank)
-        else:
-            return ''
-        return cls.lineage_of_names(taxid, name_class)[rank_index]
+        # Scan the cached taxid chain for the rank and fetch the one
+        # name that matters; building lineage_of_ranks and
+        # lineage_of_names queried a name per ancestor.
+        node_tbl = cls._node_table()
+        for txid in cls.lineage_of_taxids(taxid):
+            if node_tbl[txid][1] == rank:
+                return cls.name_for_taxid(txid, name_class)
+        return ''
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def genetic_code_for_taxid(cls, taxid: int) -> int:
-        # cls.taxid_valid_raise(taxid)
-        nd = cls.node_for_taxid(taxid)
-        return nd.genetic_code_id
+        return cls._node_table()[cls._normalized_taxid(taxid)][2]
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def mito_genetic_code_for_taxid(cls, taxid: int) -> int:
-        # cls.taxid_valid_raise(taxid)
-        nd = cls.node_for_taxid(taxid)
-        mtgcid = nd.mitochondrial_genetic_code_id
-        if mtgcid is None:
-            mtgcid = 0
-        return mtgcid
+        # A missing mitochondrial genetic code is stored as 0 in the
+        # in-memory node table.
+        return cls._node_table()[cls._normalized_taxid(taxid)][3]
 
     # **********************************************************************
     # Operations on Node objects.
     # **********************************************************************
 
     _taxid_node_dict: dict[int, Node] = dict()
+    _lineage_nodes_cache: dict[int, tuple[Node, ...]] = dict()
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def node_for_taxid(cls, taxid: int) -> Node:
         if taxid in cls._taxid_node_dict:
             return cls._taxid_node_dict[taxid]
-        cls.taxid_valid_raise(taxid)
-        txid = cls.updated_taxid(taxid)
-        stmt = select(Node).where(Node.tax_id == txid)
-        nodes = cls._sess.scalars(stmt).all()
-        assert len(nodes) == 1
-        node = nodes[0]
+        txid = cls._normalized_taxid(taxid)
+        # Session.get consults the identity map first and only queries
+        # on a miss; tax_id is the primary key, so at most one row.
+        node = cls._sess.get(Node, txid)
+        assert node is not None
         cls._taxid_node_dict[taxid] = node
         return node
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def nodes_for_taxids(cls, taxids: Collection[int]) -> list[Node]:
-        return [cls.node_for_taxid(x) for x in taxids]
+        # All cache misses are resolved and fetched with a handful of IN
+        # queries instead of several queries per taxid; input order is
+        # preserved in the result.
+        taxids = list(taxids)
+        taxid_node_dict = cls._taxid_node_dict
+        # dict.fromkeys dedups while keeping order; duplicate inputs
+        # (many accessions of one species) should be paid for once.
+        missing = list(dict.fromkeys(
+            taxid for taxid in taxids if taxid not in taxid_node_dict))
+        if missing:
+            resolved = cls._resolve_taxids(missing)
+            for taxid, txid in resolved.items():
+                if txid < 0:
+                    message = f'{taxid}'
+                    raise TaxIdInvalidError(message)
+            stmt = select(Node).where(
+                Node.tax_id.in_(set(resolved.values())))
+            node_for_txid = {n.tax_id: n
+                             for n in cls._sess.scalars(stmt).all()}
+            for taxid in missing:
+                taxid_node_dict[taxid] = node_for_txid[resolved[taxid]]
+        return [taxid_node_dict[taxid] for taxid in taxids]
+
+    @classmethod  # --------------------------------------------------------
+    def _resolve_taxids(cls, taxids: Collection[int]) -> dict[int, int]:
+        # Batched updated_taxid: one IN query against the active table
+        # and, for the leftovers only, one each against the merged and
+        # deleted tables. Merged map to their replacement, deleted to -1,
+        # unknown to -2.
+        remaining = set(taxids)
+        sess = cls._sess
+        resolved: dict[int, int] = dict()
+        stmt = select(Node.tax_id).where(Node.tax_id.in_(remaining))
+        for txid in sess.scalars(stmt).all():
+            resolved[txid] = txid
+        remaining -= resolved.keys()
+        if remaining:
+            stmt = select(MergedNode.old_tax_id, MergedNode.new_tax_id
+                          ).where(MergedNode.old_tax_id.in_(remaining))
+            for old_txid, new_txid in sess.execute(stmt).all():
+                resolved[old_txid] = new_txid
+            remaining -= resolved.keys()
+        if remaining:
+            stmt = select(DeletedNode.tax_id).where(
+                DeletedNode.tax_id.in_(remaining))
+            for txid in sess.scalars(stmt).all():
+                resolved[txid] = -1
+            remaining -= resolved.keys()
+        for txid in remaining:
+            resolved[txid] = -2
+        cls._updated_taxid_cache.update(resolved)
+        return resolved
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
@@ -282,52 +446,72 @@ class TaxonomySQL(Taxonomy):
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def lineage_of_nodes(cls, node: Node) -> list[Node]:
-        # ------------------------------------------------------------------
-        def recurse_lineage(n: Node, lineage: MutableSequence[Node]
-                            ) -> list[Node]:
-            lineage.append(n)
-            if n != cls.root_node():
-                parent_taxid = n.parent_tax_id
-                if parent_taxid in cls._taxid_node_dict:
-                    n = cls._taxid_node_dict[parent_taxid]
-                else:
-                    n = n.parent
-                    cls._taxid_node_dict[n.tax_id] = n
-                return recurse_lineage(n, lineage)
-            else:
-                return list(lineage)
-        # ------------------------------------------------------------------
-
-        lineage = list()
-        lineage = recurse_lineage(node, lineage)
-        lineage.reverse()
+        # The in-memory taxid chain plus one IN query hydrates the
+        # whole lineage; walking n.parent lazy-loaded one ancestor per
+        # round trip.
+        cache_key = node.tax_id
+        if cache_key in cls._lineage_nodes_cache:
+            return list(cls._lineage_nodes_cache[cache_key])
+        taxid_node_dict = cls._taxid_node_dict
+        ln_taxid = cls.lineage_of_taxids(node.tax_id)
+        missing = [x for x in ln_taxid if x not in taxid_node_dict]
+        if missing:
+            stmt = select(Node).where(Node.tax_id.in_(missing))
+            for n in cls._sess.scalars(stmt).all():
+                taxid_node_dict[n.tax_id] = n
+        lineage = [taxid_node_dict[x] for x in ln_taxid]
+        # Cached as a tuple; callers get a fresh list they may mutate.
+        cls._lineage_nodes_cache[cache_key] = tuple(lineage)
         return lineage
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def common_node(cls, nodes: Collection[Node]) -> Node:
+        # Mirrors the prefix-scan LCA in the RAM backend: lineages are
+        # root-ordered, so the answer is the last member of the longest
+        # shared prefix, with no set intersections or re-walks.
         nodes = list(nodes)
-        shared = set(cls.lineage_of_nodes(nodes[0]))
+        lineage_of_nodes = cls.lineage_of_nodes
+        shared = lineage_of_nodes(nodes[0])
+        n_shared = len(shared)
         for node in nodes[1:]:
-            lineage = cls.lineage_of_nodes(node)
-            shared = shared & set(lineage)
-        shared_lineage = tuple()
-        for node in shared:
-            lineage = cls.lineage_of_nodes(node)
-            if len(lineage) > len(shared_lineage):
-                shared_lineage = lineage
-        return shared_lineage[-1]
+            lineage = lineage_of_nodes(node)
+            limit = min(n_shared, len(lineage))
+            i = 0
+            while i < limit and shared[i] == lineage[i]:
+                i += 1
+            n_shared = i
+        return shared[n_shared - 1]
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def names_for_node(cls, node: Node) -> dict[str, tuple[str]]:
-        names: list[Name] = list(node.names)
-        return invert_dict({x.name: x.name_class for x in names}, tuple, True)
+        # One bucketing pass; the invert_dict detour built an
+        # intermediate dict that also collapsed duplicate names across
+        # name classes.
+        names_dict: dict[str, list[str]] = dict()
+        for x in node.names:
+            names_dict.setdefault(x.name_class, []).append(x.name)
+        return {name_class: tuple(ns)
+                for name_class, ns in names_dict.items()}
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized
     def nodes_for_name(cls, name: str) -> list[Node]:
-        return cls.nodes_for_taxids(cls.taxids_for_name(name))
+        name = name.strip()
+        if len(name) == 0:
+            return list()
+        # One JOIN returns the nodes directly instead of a name query
+        # followed by a node query.
+        stmt = (select(Node)
+                .join(Name, Name.tax_id == Node.tax_id)
+                .where(Name.name_norm == normalize_name(name))
+                .distinct())
+        nodes = sorted(cls._sess.scalars(stmt).all(),
+                       key=lambda n: n.tax_id)
+        for node in nodes:
+            cls._taxid_node_dict[node.tax_id] = node
+        return nodes
 
     @classmethod  # --------------------------------------------------------
     @_check_initialized